@@ -1,20 +1,26 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from binance.client import Client
+from binance.helpers import interval_to_milliseconds
+import asyncio
+import aiohttp
 import time
 from datetime import datetime
 import pytz
 import os
 from tqdm import tqdm
-
-# Binance API credentials
-api_key = ''
-api_secret = ''
-client = Client(api_key, api_secret)
+from tqdm.asyncio import tqdm_asyncio
 
 # Configuration
 symbols = ['BTCUSDT']
 interval = Client.KLINE_INTERVAL_1HOUR
 limit = 1000
+max_concurrent_requests = 10  # Caps open connections only; pacing is done by the rate limiter
+request_weight_per_minute = 2400  # Share of Binance's 6000/min REQUEST_WEIGHT budget per IP
+default_retry_after = 60  # Seconds to back off on 429/418 without a Retry-After header
+klines_url = 'https://api.binance.com/api/v3/klines'
 start_time_str = "2022-01-01 00:00:00"
 end_time_str = "2025-06-01 00:00:00"
 
@@ -24,61 +30,122 @@ def str_to_timestamp(time_str):
     dt = pytz.utc.localize(dt)
     return int(dt.timestamp() * 1000)
 
-def timestamp_to_datetime(timestamp):
-    return datetime.fromtimestamp(timestamp / 1000.0, tz=pytz.utc)
+def klines_request_weight(limit):
+    # Request weight of GET /api/v3/klines by `limit`, per the Binance API docs
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+class RequestRateLimiter:
+    """Spaces request starts evenly so the request weight stays within the per-minute budget."""
+
+    def __init__(self, weight_per_minute, request_weight):
+        self.spacing = 60.0 * request_weight / weight_per_minute
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+
+    async def wait(self):
+        while True:
+            slot = max(time.monotonic(), self.next_slot, self.paused_until)
+            self.next_slot = slot + self.spacing
+            await asyncio.sleep(slot - time.monotonic())
+            # A rate-limit back-off may have started while this request was waiting
+            if time.monotonic() >= self.paused_until:
+                return
 
-def get_kline_time(client, symbol, interval, start_time, end_time, limit):
-    klines = []
-    start_ts = start_time
-    total_hours = (end_time - start_time) / (1000 * 60 * 60)
-    total_batches = total_hours / limit
-    with tqdm(total=total_batches, desc=f"Fetching {symbol} klines", leave=False) as pbar:
-        while start_ts < end_time:
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def klines_to_dataframe(klines):
+    df = pd.DataFrame(klines[:, 1:6], columns=['open', 'high', 'low', 'close', 'volume'])
+    df.insert(0, 'datetime', pd.to_datetime(klines[:, 0].astype(np.int64), unit='ms', utc=True))
+    return df
+
+async def fetch_kline_window(session, semaphore, rate_limiter, buf, offset, symbol, interval,
+                             window_start, window_end, limit):
+    params = {
+        'symbol': symbol,
+        'interval': interval,
+        'startTime': window_start,
+        'endTime': window_end,
+        'limit': limit
+    }
+    while True:
+        await rate_limiter.wait()
+        async with semaphore:
             try:
-                batch = client.get_klines(
-                    symbol=symbol,
-                    interval=interval,
-                    startTime=start_ts,
-                    endTime=end_time,
-                    limit=limit
-                )
-                if not batch:
-                    break
-                klines.extend(batch)
-                start_ts = batch[-1][0] + 1
-                pbar.update(1)
-                time.sleep(0.1)
-            except Exception as e:
+                async with session.get(klines_url, params=params) as response:
+                    if response.status in (418, 429):
+                        # Rate limited (418 = IP ban); every request waits out Retry-After
+                        retry_after = float(response.headers.get('Retry-After', default_retry_after))
+                        print(f"Rate limited fetching klines for {symbol} (HTTP {response.status}), "
+                              f"backing off {retry_after:.0f}s")
+                        rate_limiter.pause(retry_after)
+                        continue
+                    if 400 <= response.status < 500:
+                        # Bad symbol, interval or parameters: retrying cannot succeed
+                        raise ValueError(f"Binance rejected klines request for {symbol} "
+                                         f"(HTTP {response.status}): {await response.text()}")
+                    response.raise_for_status()
+                    batch = await response.json()
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 print(f"Error fetching klines for {symbol}: {e}")
-                time.sleep(1)
-                continue
-    return klines
+        await asyncio.sleep(1)
+    if batch:
+        # Keep open time and OHLCV, parsed straight into this window's slot
+        rows = np.array(batch, dtype=object)[:, :6].astype(np.float64)
+        buf[offset:offset + len(rows)] = rows
+
+async def fetch_klines(rate_limiter, symbol, interval, start_time, end_time, limit):
+    # Each request covers exactly `limit` candles, so the windows are known up front
+    step = limit * interval_to_milliseconds(interval)
+    windows = [(ts, min(ts + step - 1, end_time)) for ts in range(start_time, end_time + 1, step)]
+    # One `limit`-row slot per window; slots of missing candles stay NaN
+    buf = np.full((len(windows) * limit, 6), np.nan)
+    semaphore = asyncio.Semaphore(max_concurrent_requests)
+    async with aiohttp.ClientSession() as session:
+        tasks = [
+            asyncio.ensure_future(fetch_kline_window(session, semaphore, rate_limiter, buf, i * limit,
+                                                     symbol, interval, window_start, window_end, limit))
+            for i, (window_start, window_end) in enumerate(windows)
+        ]
+        try:
+            await tqdm_asyncio.gather(*tasks, desc=f"Fetching {symbol} klines", leave=False)
+        except Exception:
+            # Stop the remaining windows instead of letting them keep hitting the API
+            for task in tasks:
+                task.cancel()
+            raise
+    # Slots follow window order, so the remaining rows are sorted by open time
+    return buf[~np.isnan(buf[:, 0])]
+
+def get_kline_time(rate_limiter, symbol, interval, start_time, end_time, limit):
+    return asyncio.run(fetch_klines(rate_limiter, symbol, interval, start_time, end_time, limit))
 
 # Convert start and end times to timestamps
 start_time = str_to_timestamp(start_time_str)
 end_time = str_to_timestamp(end_time_str)
 
-# Collect data for all symbols
+# Collect data for all symbols, sharing one request budget across them
+rate_limiter = RequestRateLimiter(request_weight_per_minute, klines_request_weight(limit))
 dataframes = {}
 for symbol in tqdm(symbols, desc="Processing symbols"):
-    klines = get_kline_time(client, symbol, interval, start_time, end_time, limit)
-    kline_data = [{
-        'datetime': timestamp_to_datetime(kline[0]),
-        'open': float(kline[1]),
-        'high': float(kline[2]),
-        'low': float(kline[3]),
-        'close': float(kline[4]),
-        'volume': float(kline[5])
-    } for kline in klines]
-    dataframes[symbol] = pd.DataFrame(kline_data)
+    klines = get_kline_time(rate_limiter, symbol, interval, start_time, end_time, limit)
+    dataframes[symbol] = klines_to_dataframe(klines)
 
 # Create the 'candle' folder
 candle_folder = 'candle'
 os.makedirs(candle_folder, exist_ok=True)
 
-# Save each symbol's DataFrame to a separate CSV
+# Save each symbol's DataFrame to a separate Parquet file
 for symbol in symbols:
-    csv_filename = os.path.join(candle_folder, f'{symbol}_{interval}_binance.csv')
+    parquet_filename = os.path.join(candle_folder, f'{symbol}_{interval}_binance.parquet')
     symbol_df = dataframes[symbol][['datetime', 'open', 'high', 'low', 'close', 'volume']]
-    symbol_df.to_csv(csv_filename, index=False)
-    print(f'Saved {csv_filename}')
+    table = pa.Table.from_pandas(symbol_df, preserve_index=False)
+    pq.write_table(table, parquet_filename, compression='zstd', compression_level=3)
+    print(f'Saved {parquet_filename}')
@@ -1,30 +1,112 @@
 # utils/data_loader.py
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv
 import os
-from typing import List, Dict
+from joblib import Parallel, delayed
+from typing import List, Dict, Optional, Tuple
 
-def load_kline_data(candle_folder: str, symbols: List[str], interval: str = '1h') -> Dict[str, pd.DataFrame]:
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+def _read_csv_arrow(csv_path: str) -> pd.DataFrame:
+    """
+    Read a kline CSV with pyarrow's multithreaded reader.
+    
+    Args:
+        csv_path (str): Path to the kline CSV file
+    
+    Returns:
+        pd.DataFrame: OHLCV DataFrame indexed by datetime
+    """
+    # The datetime type is inferred so naive and offset timestamps both parse, as with pd.read_csv
+    column_types = {col: pa.float64() for col in OHLCV_COLUMNS}
+    convert_options = csv.ConvertOptions(column_types=column_types,
+                                         include_columns=['datetime'] + OHLCV_COLUMNS)
+    table = csv.read_csv(csv_path, convert_options=convert_options)
+    return table.to_pandas(self_destruct=True).set_index('datetime')
+
+def _read_polars(path: str) -> pd.DataFrame:
     """
-    Load kline data from CSV files in the candle folder for specified symbols.
+    Read a kline Parquet or CSV file through a Polars lazy query.
+    
+    Args:
+        path (str): Path to the kline file
+    
+    Returns:
+        pd.DataFrame: OHLCV DataFrame indexed by datetime
+    """
+    # Imported lazily so the pandas engine does not require Polars
+    import polars as pl
+
+    if path.endswith('.parquet'):
+        lf = pl.scan_parquet(path)
+    else:
+        lf = pl.scan_csv(path, try_parse_dates=True)
+    lf = lf.select(['datetime'] + OHLCV_COLUMNS).sort('datetime')
+    return lf.collect(engine='streaming').to_pandas().set_index('datetime')
+
+def _load_one(candle_folder: str, symbol: str, interval: str,
+              use_arrow: bool, engine: str) -> Tuple[str, Optional[pd.DataFrame]]:
+    """
+    Load the kline file of a single symbol.
+    
+    Args:
+        candle_folder (str): Path to the candle folder (e.g., 'candle')
+        symbol (str): Symbol to load (e.g., 'BTCUSDT')
+        interval (str): Interval of the data (e.g., '1h')
+        use_arrow (bool): Parse CSV files with pyarrow instead of pandas
+        engine (str): 'pandas' or 'polars'
+    
+    Returns:
+        Tuple[str, Optional[pd.DataFrame]]: Symbol and its DataFrame, or None if it could not be loaded
+    """
+    parquet_path = os.path.join(candle_folder, f'{symbol}_{interval}_binance.parquet')
+    csv_path = os.path.join(candle_folder, f'{symbol}_{interval}_binance.csv')
+    if os.path.exists(parquet_path):
+        path = parquet_path
+    elif os.path.exists(csv_path):
+        path = csv_path
+    else:
+        print(f"Warning: Kline file for {symbol} ({parquet_path} or {csv_path}) not found")
+        return symbol, None
+    try:
+        if engine == 'polars':
+            df = _read_polars(path)
+        elif path == parquet_path:
+            df = pd.read_parquet(path, engine='pyarrow', columns=['datetime'] + OHLCV_COLUMNS)
+            df.set_index('datetime', inplace=True)
+        elif use_arrow:
+            df = _read_csv_arrow(path)
+        else:
+            df = pd.read_csv(path, parse_dates=['datetime'])
+            df.set_index('datetime', inplace=True)
+        return symbol, df[OHLCV_COLUMNS]
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return symbol, None
+
+def load_kline_data(candle_folder: str, symbols: List[str], interval: str = '1h',
+                    use_arrow: bool = False, engine: str = 'pandas') -> Dict[str, pd.DataFrame]:
+    """
+    Load kline data from the candle folder for specified symbols.
+    Parquet files are preferred; CSV files are read when no Parquet file exists.
     
     Args:
         candle_folder (str): Path to the candle folder (e.g., 'candle')
         symbols (List[str]): List of symbols (e.g., ['BTCUSDT', 'ETHUSDT'])
         interval (str): Interval of the data (e.g., '1h')
+        use_arrow (bool): Parse CSV files with pyarrow instead of pandas
+        engine (str): 'pandas' or 'polars' (lazy scan, ignores use_arrow)
     
     Returns:
         Dict[str, pd.DataFrame]: Dictionary mapping symbols to their DataFrames
     """
-    dataframes = {}
-    for symbol in symbols:
-        csv_path = os.path.join(candle_folder, f'{symbol}_{interval}_binance.csv')
-        if not os.path.exists(csv_path):
-            print(f"Warning: CSV file for {symbol} ({csv_path}) not found")
-            continue
-        try:
-            df = pd.read_csv(csv_path, parse_dates=['datetime'])
-            df.set_index('datetime', inplace=True)
-            dataframes[symbol] = df[['open', 'high', 'low', 'close', 'volume']]
-        except Exception as e:
-            print(f"Error loading {csv_path}: {e}")
-    return dataframes
\ No newline at end of file
+    valid_engines = ['pandas', 'polars']
+    if engine not in valid_engines:
+        raise ValueError(f"Engine must be one of {valid_engines}")
+
+    # Symbols load independently and file parsing releases the GIL, so threads suffice
+    results = Parallel(n_jobs=-1, prefer='threads')(
+        delayed(_load_one)(candle_folder, symbol, interval, use_arrow, engine) for symbol in symbols
+    )
+    return {symbol: df for symbol, df in results if df is not None}
\ No newline at end of file
@@ -1,8 +1,25 @@
 # utils/metrics_calculation.py
 import numpy as np
 import pandas as pd
+import math
 import re
-from typing import Dict, Optional, Tuple, List
+from numba import njit
+from typing import Dict, Optional, Tuple
+
+_INTERVAL_RE = re.compile(r"(\d+)\s*(h|d)", re.IGNORECASE)
+
+# Periods per year and their square root for the intervals supported by resample_data
+_ANNUALIZATION = {
+    interval: (periods, math.sqrt(periods))
+    for interval, periods in {
+        '1h': 8760.0,
+        '2h': 4380.0,
+        '4h': 2190.0,
+        '8h': 1095.0,
+        '12h': 730.0,
+        '1d': 365.0,
+    }.items()
+}
 
 def get_periods_per_year(interval: str) -> float:
     """
@@ -14,7 +31,10 @@ def get_periods_per_year(interval: str) -> float:
     Returns:
         float: Number of periods per year
     """
-    m = re.match(r"(\d+)\s*(h|d)", interval, re.IGNORECASE)
+    ann = _ANNUALIZATION.get(interval.lower())
+    if ann is not None:
+        return ann[0]
+    m = _INTERVAL_RE.match(interval)
     if not m:
         raise ValueError(f"Invalid interval format: {interval}")
     num, unit = m.groups()
@@ -26,35 +46,93 @@ def get_periods_per_year(interval: str) -> float:
         return 365 / num   # 365 days in a non-leap year
     return 1
 
-def calculate_returns_from_signals(df: pd.DataFrame, signals: np.ndarray) -> Tuple[pd.Series, List[bool]]:
+def _get_annualization(interval: str) -> Tuple[float, float]:
     """
-    Calculate returns and trade outcomes based on buy/sell signals.
+    Get the periods per year and the default annualization factor for an interval.
     
     Args:
-        df (pd.DataFrame): DataFrame with 'close' column
-        signals (np.ndarray): Array of signals (1 = buy, -1 = sell, 0 = hold)
+        interval (str): Time interval (e.g., '1h', '2h', '1d')
     
     Returns:
-        Tuple[pd.Series, List[bool]]: Series of returns and list of trade profitability (True if positive)
+        Tuple[float, float]: Periods per year and its square root
     """
-    position = 0
-    returns = []
-    trade_outcomes = []  # Track if each trade was profitable
-    entry_price = 0
+    ann = _ANNUALIZATION.get(interval.lower())
+    if ann is not None:
+        return ann
+    periods_per_year = get_periods_per_year(interval)
+    return periods_per_year, math.sqrt(periods_per_year)
+
+@njit(cache=True, boundscheck=False)
+def _walk_signals_nb(closes: np.ndarray, signals: np.ndarray) -> Tuple[np.ndarray, int, float]:
+    """
+    Walk the signals once, computing each completed trade's return and the win/return totals.
+    
+    Args:
+        closes (np.ndarray): float64 array of close prices
+        signals (np.ndarray): int8 array of signals (1 = buy, -1 = sell, 0 = hold)
     
-    for i in range(1, len(df)):
+    Returns:
+        Tuple[np.ndarray, int, float]: Return of each completed trade, number of winning trades and sum of returns
+    """
+    n = len(closes)
+    # Each trade spans at least two bars, so n // 2 bounds the trade count
+    max_trades = n // 2
+    trade_returns = np.empty(max_trades, dtype=np.float64)
+    position = 0
+    entry_price = 0.0
+    wins = 0
+    total_return = 0.0
+    k = 0
+    for i in range(1, n):
         if signals[i] == 1 and position == 0:  # Buy
             position = 1
-            entry_price = df['close'].iloc[i]
+            entry_price = closes[i]
         elif signals[i] == -1 and position == 1:  # Sell
             position = 0
-            exit_price = df['close'].iloc[i]
-            trade_return = (exit_price - entry_price) / entry_price
-            returns.append(trade_return)
-            trade_outcomes.append(trade_return > 0)  # True if profitable
+            trade_return = (closes[i] - entry_price) / entry_price
+            trade_returns[k] = trade_return
+            if trade_return > 0:
+                wins += 1
+            total_return += trade_return
+            k += 1
+    return trade_returns[:k], wins, total_return
+
+def _walk_trades(closes: np.ndarray, signals: np.ndarray) -> Tuple[np.ndarray, int, float]:
+    """
+    Run the signal walker on raw close prices and signals.
+    
+    Args:
+        closes (np.ndarray): Array of close prices
+        signals (np.ndarray): Array of signals (1 = buy, -1 = sell, 0 = hold)
+    
+    Returns:
+        Tuple[np.ndarray, int, float]: Return of each completed trade, number of winning trades and sum of returns
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    signals = np.asarray(signals, dtype=np.int8)
+    # The kernel runs without bounds checks, so the arrays must line up
+    if len(closes) != len(signals):
+        raise ValueError(f"signals length ({len(signals)}) must match the number of bars ({len(closes)})")
+    return _walk_signals_nb(closes, signals)
+
+def calculate_returns_from_signals(df: pd.DataFrame, signals: np.ndarray) -> Tuple[pd.Series, np.ndarray]:
+    """
+    Calculate returns and trade outcomes based on buy/sell signals.
+    
+    Args:
+        df (pd.DataFrame): DataFrame with 'close' column
+        signals (np.ndarray): Array of signals (1 = buy, -1 = sell, 0 = hold), one per row of df;
+            a length mismatch raises ValueError
     
-    return (pd.Series(returns, index=df.index[1:len(returns) + 1]) if returns else pd.Series(dtype=float), 
-            trade_outcomes)
+    Returns:
+        Tuple[pd.Series, np.ndarray]: Series of returns and boolean array of trade profitability (True if positive)
+    """
+    trade_returns, _, _ = _walk_trades(df['close'].to_numpy(), signals)
+    trade_outcomes = trade_returns > 0  # True if profitable
+
+    if not len(trade_returns):
+        return pd.Series(dtype=float), trade_outcomes
+    return pd.Series(trade_returns, index=df.index[1:len(trade_returns) + 1]), trade_outcomes
 
 def calculate_metrics(df: pd.DataFrame, interval: str, signals: np.ndarray, 
                      annualization_factor: Optional[float] = None) -> Dict:
@@ -63,27 +141,32 @@ def calculate_metrics(df: pd.DataFrame, interval: str, signals: np.ndarray,
     Returns a dict suitable for JSON serialization.
     
     Args:
-        df (pd.DataFrame): DataFrame with 'datetime' and 'close' columns
+        df (pd.DataFrame): DataFrame with a 'close' column and a DatetimeIndex named 'datetime'.
+            Frames with a 'datetime' column should be normalized once before a sweep, e.g.
+            df.set_index(pd.to_datetime(df['datetime']))
         interval (str): Time interval (e.g., '1h', '2h', '1d')
-        signals (np.ndarray): Array of signals (1 = buy, -1 = sell, 0 = hold)
+        signals (np.ndarray): Array of signals (1 = buy, -1 = sell, 0 = hold), one per row of df;
+            a length mismatch raises ValueError
         annualization_factor (float, optional): Factor for annualizing metrics
     
     Returns:
         Dict: Performance metrics including win rate
     """
-    # Ensure datetime column exists
-    df = df.copy()
-    if df.index.name != "datetime" or not np.issubdtype(df.index.dtype, np.datetime64):
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        df.set_index("datetime", inplace=True)
+    # Callers normalize the index once, so no datetime parsing happens per call
+    if df.index.name != "datetime" or not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("df must be indexed by a DatetimeIndex named 'datetime'; "
+                         "use df.set_index(pd.to_datetime(df['datetime'])) once before calling")
+    idx = df.index
+    closes = df['close'].to_numpy(copy=False)
     
     # Calculate returns and trade outcomes from signals
-    returns, trade_outcomes = calculate_returns_from_signals(df, signals)
+    trade_returns, win_trades, total_ret = _walk_trades(closes, signals)
+    returns = pd.Series(trade_returns, index=idx[1:len(trade_returns) + 1])
     
     # Set annualization factor
-    periods_per_year = get_periods_per_year(interval)
+    periods_per_year, default_factor = _get_annualization(interval)
     if annualization_factor is None:
-        annualization_factor = np.sqrt(periods_per_year)
+        annualization_factor = default_factor
 
     # Sharpe Ratio
     pnl_std = returns.std() if len(returns) else 0
@@ -91,31 +174,22 @@ def calculate_metrics(df: pd.DataFrame, interval: str, signals: np.ndarray,
     sharpe = (mean_return / pnl_std * annualization_factor) if pnl_std else 0
 
     # Cumulative and drawdowns
-    cumu = returns.cumsum()
-    running_max = cumu.cummax()
-    drawdowns = cumu - running_max
+    cum = np.cumsum(trade_returns)
+    peak = np.maximum.accumulate(cum)
+    drawdowns = cum - peak
     max_dd = drawdowns.min() if len(drawdowns) else 0
 
-    # Drawdown dates
-    dd_end_idx = drawdowns.idxmin() if len(drawdowns) else df.index[0]
-    dd_end_loc = df.index.get_loc(dd_end_idx)
-    dd_end = df.index[dd_end_loc]
-
-    if dd_end_loc > 0:
-        pre = running_max.iloc[:dd_end_loc] == cumu.iloc[:dd_end_loc]
-        if pre.any():
-            start_label = pre[pre].index[-1]
-            start_loc = df.index.get_loc(start_label)
-            dd_start = df.index[start_loc]
-        else:
-            dd_start = df.index[0]
+    # Drawdown dates, located by position in the returns series
+    if len(drawdowns):
+        dd_end_i = int(drawdowns.argmin())
+        peaks = np.flatnonzero(peak[:dd_end_i] == cum[:dd_end_i])
+        dd_start_i = int(peaks[-1]) if len(peaks) else 0
+        recovered = cum[dd_end_i:] >= peak[dd_end_i]
+        dd_recover_i = dd_end_i + int(recovered.argmax()) if recovered.any() else dd_end_i
+        dd_dates = returns.index.values
+        mdd_days = (dd_dates[dd_recover_i] - dd_dates[dd_start_i]) / np.timedelta64(1, 'D')
     else:
-        dd_start = dd_end
-
-    post = cumu.iloc[dd_end_loc:]
-    recover = post[post >= running_max.iloc[dd_end_loc]]
-    dd_recover = recover.index[0] if len(recover) else dd_end
-    mdd_days = (dd_recover - dd_start).total_seconds() / 86400 if dd_start and dd_recover else 0
+        mdd_days = 0
 
     # Sortino Ratio
     downside = returns[returns < 0]
@@ -125,27 +199,29 @@ def calculate_metrics(df: pd.DataFrame, interval: str, signals: np.ndarray,
     # Calmar Ratio
     calmar = (mean_return * periods_per_year / abs(max_dd)) if max_dd else 0
     ann_return = mean_return * periods_per_year
-    num_trades = len(returns)  # Number of completed trades
-    total_ret = returns.sum()
-    tpi = num_trades / len(df) if len(df) else 0
+    num_trades = len(trade_returns)  # Number of completed trades
+    tpi = num_trades / len(idx) if len(idx) else 0
     sr_cr = sharpe / calmar if calmar else 0
 
     # Win Rate
-    win_trades = sum(1 for outcome in trade_outcomes if outcome) if trade_outcomes else 0
     win_rate = (win_trades / num_trades * 100) if num_trades else 0.0
 
+    # Round all 4-decimal metrics in one batch
+    vals = np.round(np.array([sharpe, calmar, max_dd, sortino, ann_return,
+                              total_ret, tpi, mdd_days, sr_cr], dtype=float), 4)
+
     return {
-        "SR": round(sharpe, 4),
-        "CR": round(calmar, 4),
-        "MDD": round(max_dd, 4),
-        "sortino_ratio": round(sortino, 4),
-        "AR": round(ann_return, 4),
+        "SR": float(vals[0]),
+        "CR": float(vals[1]),
+        "MDD": float(vals[2]),
+        "sortino_ratio": float(vals[3]),
+        "AR": float(vals[4]),
         "num_of_trades": float(num_trades),
-        "TR": round(total_ret, 4),
-        "trades_per_interval": round(tpi, 4),
-        "MDD_MAX_DURATION_IN_DAY": round(mdd_days, 4),
-        "SR_CR": round(sr_cr, 4),
+        "TR": float(vals[5]),
+        "trades_per_interval": float(vals[6]),
+        "MDD_MAX_DURATION_IN_DAY": float(vals[7]),
+        "SR_CR": float(vals[8]),
         "win_rate": round(win_rate, 2),  # Win rate in percentage
-        "backtest_start_date": df.index.min().isoformat(),
-        "backtest_end_date": df.index.max().isoformat(),
+        "backtest_start_date": idx.min().isoformat(),
+        "backtest_end_date": idx.max().isoformat(),
     }
\ No newline at end of file
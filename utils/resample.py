@@ -1,14 +1,84 @@
 # utils/resample.py
+import importlib.util
 import pandas as pd
-from typing import Dict
+from joblib import Parallel, delayed
+from typing import Dict, Optional, Tuple
 
-def resample_data(dataframes: Dict[str, pd.DataFrame], interval: str) -> Dict[str, pd.DataFrame]:
+def _resample_polars(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Resample a kline DataFrame with Polars group_by_dynamic.
+    
+    Args:
+        df (pd.DataFrame): OHLCV DataFrame indexed by datetime
+        interval (str): Target interval (e.g., '4h')
+    
+    Returns:
+        pd.DataFrame: Resampled OHLCV DataFrame indexed by datetime
+    """
+    # Imported lazily so the pandas engine does not require Polars
+    import polars as pl
+
+    # Work on a fixed 'datetime' column whatever the index is named
+    lf = (pl.from_pandas(df.rename_axis('datetime').reset_index()).lazy()
+          .sort('datetime')
+          .group_by_dynamic('datetime', every=interval, closed='left', label='left')
+          .agg([
+              pl.col('open').first(),
+              pl.col('high').max(),
+              pl.col('low').min(),
+              pl.col('close').last(),
+              pl.col('volume').sum(),
+          ])
+          .drop_nulls())
+    return lf.collect().to_pandas().set_index('datetime').rename_axis(df.index.name)
+
+def _resample_one(symbol: str, df: pd.DataFrame, interval: str,
+                  engine: str) -> Tuple[str, Optional[pd.DataFrame]]:
+    """
+    Resample the kline data of a single symbol.
+    
+    Args:
+        symbol (str): Symbol of the DataFrame (e.g., 'BTCUSDT')
+        df (pd.DataFrame): OHLCV DataFrame indexed by datetime
+        interval (str): Target interval (e.g., '4h')
+        engine (str): 'polars' or 'pandas'
+    
+    Returns:
+        Tuple[str, Optional[pd.DataFrame]]: Symbol and its resampled DataFrame, or None if it was skipped
+    """
+    if df.empty:
+        print(f"Warning: Empty DataFrame for {symbol}")
+        return symbol, None
+    
+    # Resampling rules
+    resample_rule = interval
+    agg_dict = {
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum'
+    }
+    
+    try:
+        # Resample the DataFrame
+        if engine == 'polars':
+            return symbol, _resample_polars(df, resample_rule)
+        return symbol, df.resample(resample_rule).agg(agg_dict).dropna()
+    except Exception as e:
+        print(f"Error resampling {symbol} to {interval}: {e}")
+        return symbol, None
+
+def resample_data(dataframes: Dict[str, pd.DataFrame], interval: str,
+                  engine: str = 'polars') -> Dict[str, pd.DataFrame]:
     """
     Resample kline data to the specified interval.
     
     Args:
         dataframes (Dict[str, pd.DataFrame]): Dictionary of symbol DataFrames
         interval (str): Target interval (e.g., '1h', '2h', '4h', '8h', '12h', '1d')
+        engine (str): 'polars' (group_by_dynamic, default; falls back to pandas if not installed)
+            or 'pandas' (DataFrame.resample)
     
     Returns:
         Dict[str, pd.DataFrame]: Resampled DataFrames
@@ -16,28 +86,15 @@ def resample_data(dataframes: Dict[str, pd.DataFrame], interval: str) -> Dict[st
     valid_intervals = ['1h', '2h', '4h', '8h', '12h', '1d']
     if interval not in valid_intervals:
         raise ValueError(f"Interval must be one of {valid_intervals}")
+    valid_engines = ['pandas', 'polars']
+    if engine not in valid_engines:
+        raise ValueError(f"Engine must be one of {valid_engines}")
+    # Check once up front so a missing dependency is not swallowed per symbol
+    if engine == 'polars' and importlib.util.find_spec('polars') is None:
+        print("Warning: polars is not installed, resampling with pandas")
+        engine = 'pandas'
 
-    resampled_data = {}
-    for symbol, df in dataframes.items():
-        if df.empty:
-            print(f"Warning: Empty DataFrame for {symbol}")
-            continue
-        
-        # Resampling rules
-        resample_rule = interval
-        agg_dict = {
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        }
-        
-        try:
-            # Resample the DataFrame
-            resampled_df = df.resample(resample_rule).agg(agg_dict).dropna()
-            resampled_data[symbol] = resampled_df
-        except Exception as e:
-            print(f"Error resampling {symbol} to {interval}: {e}")
-    
-    return resampled_data
\ No newline at end of file
+    results = Parallel(n_jobs=-1, prefer='threads')(
+        delayed(_resample_one)(symbol, df, interval, engine) for symbol, df in dataframes.items()
+    )
+    return {symbol: df for symbol, df in results if df is not None}
\ No newline at end of file